@@ -0,0 +1,128 @@
+"""
+A harness for running `Application`-style command-line apps in process.
+
+An app is anything that can be constructed with `stdout`, `stderr` and `stdin`
+keyword arguments and has a `main(args)` method, like the `Application` class in
+`meetgreet_final.py`. Each run gets its own in-memory streams, so runs are isolated
+from each other and can happen concurrently, as long as the app only does I/O
+through the streams it was given.
+"""
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO
+
+# A table-driven test case. `stdin` is the scripted input, e.g. "Ian\n" to answer a
+# single prompt. Expectations that are left as `None` are not checked.
+Case = namedtuple(
+    "Case",
+    ["name", "args", "stdin", "stdout", "stderr", "exit_code"],
+    defaults=["", None, None, 0],
+)
+
+class Result(
+    namedtuple(
+        "Result",
+        ["case", "stdout", "stderr", "exit_code", "elapsed", "error"],
+        defaults=[None],
+    )
+):
+    """
+    The outcome of running a case. `elapsed` is the wall-clock time of the run in
+    seconds. `error` is the exception that the app raised, if any, other than
+    `SystemExit`; in that case `exit_code` is `None`.
+    """
+
+    __slots__ = ()
+
+    @property
+    def failures(self):
+        """
+        Returns a list of messages describing how the result differs from what the
+        case expected. The list is empty if the case passed.
+        """
+        failures = []
+        if self.error is not None:
+            failures.append(f"raised {self.error!r}")
+
+        for field in ["stdout", "stderr", "exit_code"]:
+            expected = getattr(self.case, field)
+            actual = getattr(self, field)
+            if expected is not None and expected != actual:
+                failures.append(f"{field}: expected {expected!r}, got {actual!r}")
+        return failures
+
+    @property
+    def passed(self):
+        return not self.failures
+
+def run(make_app, args, stdin=""):
+    """
+    Runs `make_app(...).main(args)` with `stdin` as its input, and returns a `Result`
+    with everything it wrote to stdout and stderr.
+
+    `sys.exit` is caught and turned into an exit code, the same way the interpreter
+    would: no code means 0, and a non-integer code is written to stderr and means 1.
+    """
+    return run_case(make_app, Case(name=None, args=args, stdin=stdin))
+
+def run_case(make_app, case):
+    stdout = StringIO()
+    stderr = StringIO()
+    app = make_app(stdout=stdout, stderr=stderr, stdin=StringIO(case.stdin))
+
+    error = None
+    start = time.perf_counter()
+    try:
+        app.main(list(case.args))
+    except SystemExit as e:
+        exit_code = e.code
+        if exit_code is None:
+            exit_code = 0
+    except Exception as e:
+        # Recorded rather than raised, so that one broken case doesn't lose the
+        # results of all the others in `run_cases`.
+        exit_code = None
+        error = e
+    else:
+        exit_code = 0
+    elapsed = time.perf_counter() - start
+
+    if exit_code is not None and not isinstance(exit_code, int):
+        print(exit_code, file=stderr)
+        exit_code = 1
+
+    return Result(
+        case=case,
+        stdout=stdout.getvalue(),
+        stderr=stderr.getvalue(),
+        exit_code=exit_code,
+        elapsed=elapsed,
+        error=error,
+    )
+
+def run_cases(make_app, cases, *, max_workers=None):
+    """
+    Runs each case concurrently in a thread pool, and returns the results in the
+    same order as the cases.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(lambda case: run_case(make_app, case), cases))
+
+def report(results, *, file=None):
+    """
+    Prints one line per result with its status and timing, followed by the failures
+    of any cases that didn't pass.
+    """
+    for result in results:
+        status = "ok" if result.passed else "FAIL"
+        name = result.case.name or " ".join(result.case.args)
+        print(f"{status:4} {result.elapsed * 1000:8.2f}ms  {name}", file=file)
+        for failure in result.failures:
+            print(f"       {failure}", file=file)
+
+    passed = sum(1 for result in results if result.passed)
+    total = sum(result.elapsed for result in results)
+    print(
+        f"{passed}/{len(results)} passed ({total * 1000:.2f}ms total)", file=file,
+    )
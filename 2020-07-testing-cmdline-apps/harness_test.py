@@ -0,0 +1,118 @@
+import sys
+import unittest
+from io import StringIO
+
+from harness import Case, report, run, run_cases
+from meetgreet_final import Application
+
+class HarnessTests(unittest.TestCase):
+    def test_run(self):
+        result = run(Application, ["meet"], stdin="Ian\n")
+
+        self.assertEqual(
+            result.stdout, "Hello, what's your name? " + "Nice to meet you, Ian!\n"
+        )
+        self.assertEqual(result.stderr, "")
+        self.assertEqual(result.exit_code, 0)
+
+    def test_run_error(self):
+        result = run(Application, ["wave"])
+
+        self.assertEqual(result.stdout, "")
+        self.assertEqual(result.stderr, "error: unknown subcommand: wave\n")
+        self.assertEqual(result.exit_code, 1)
+
+    def test_run_exit_with_message(self):
+        class App:
+            def __init__(self, *, stdout, stderr, stdin):
+                pass
+
+            def main(self, args):
+                sys.exit("goodbye")
+
+        result = run(App, [])
+
+        self.assertEqual(result.stderr, "goodbye\n")
+        self.assertEqual(result.exit_code, 1)
+
+    def test_run_cases(self):
+        cases = [
+            Case(
+                name="meet",
+                args=["meet"],
+                stdin="Ian\n",
+                stdout="Hello, what's your name? Nice to meet you, Ian!\n",
+            ),
+            Case(name="greet", args=["greet"], stdout="Hello!\n", stderr=""),
+            Case(
+                name="no arguments",
+                args=[],
+                stderr="error: expected exactly one command-line argument\n",
+                exit_code=1,
+            ),
+            Case(name="wrong exit code", args=["greet"], exit_code=2),
+        ]
+
+        results = run_cases(Application, cases * 10, max_workers=8)
+
+        self.assertEqual([result.case for result in results], cases * 10)
+        self.assertEqual(
+            [result.passed for result in results], [True, True, True, False] * 10
+        )
+        self.assertEqual(results[3].failures, ["exit_code: expected 2, got 0"])
+
+    def test_run_cases_with_exception(self):
+        class App:
+            def __init__(self, *, stdout, stderr, stdin):
+                self.stdout = stdout
+
+            def main(self, args):
+                if args == ["crash"]:
+                    raise ValueError("oops")
+                print("fine", file=self.stdout)
+
+        results = run_cases(
+            App,
+            [
+                Case(name="crash", args=["crash"], stdout="partial\n"),
+                Case(name="fine", args=[], stdout="fine\n"),
+            ],
+        )
+
+        self.assertIsInstance(results[0].error, ValueError)
+        self.assertIsNone(results[0].exit_code)
+        self.assertEqual(
+            results[0].failures,
+            [
+                "raised ValueError('oops')",
+                "stdout: expected 'partial\\n', got ''",
+                "exit_code: expected 0, got None",
+            ],
+        )
+        self.assertIsNone(results[1].error)
+        self.assertTrue(results[1].passed)
+
+    def test_report(self):
+        results = run_cases(
+            Application,
+            [
+                Case(name="greet", args=["greet"], stdout="Hello!\n"),
+                Case(name="wrong output", args=["greet"], stdout="Bye!\n"),
+            ],
+        )
+        out = StringIO()
+
+        report(results, file=out)
+
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 4)
+        self.assertTrue(lines[0].startswith("ok"))
+        self.assertTrue(lines[0].endswith("greet"))
+        self.assertTrue(lines[1].startswith("FAIL"))
+        self.assertEqual(
+            lines[2].strip(), "stdout: expected 'Bye!\\n', got 'Hello!\\n'"
+        )
+        self.assertTrue(lines[3].startswith("1/2 passed"))
+
+if __name__ == "__main__":
+    unittest.main()
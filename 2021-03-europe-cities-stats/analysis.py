@@ -1,13 +1,13 @@
 import bisect
 import copy
+import hashlib
 import json
 import math
 import statistics
 import string
+import sys
 from collections import Counter, defaultdict
-
-import dateutil.parser
-import numpy
+from datetime import timedelta
 
 # Session: {
 #   started_at: string (ISO 8601 timestamp),
@@ -32,36 +32,84 @@ def main():
     Prints out a sequence of formatted Markdown tables and statistics that can be
     pasted into the blog post. The results are cached on disk so that they don't have to
     be recomputed on each run of the program.
+
+    The cache is never invalidated automatically: after the data files change, delete
+    `data/results.json` (or the keys of the statistics that depend on them) so that
+    they are recomputed.
     """
     results = read_results()
-    cities = read_cities()
-    sessions = read_sessions()
+    # The raw data files are only read if some statistic is not already cached, so
+    # that a fully cached report doesn't have to parse them (or import numpy).
+    data = Dataset()
 
-    sessions_with_ip = sum(1 for session in sessions.values() if session.get("ip"))
-    sessions_with_country = sum(
-        1 for session in sessions.values() if session.get("country")
-    )
-    sessions_with_time = sum(
-        1
-        for session in sessions.values()
-        if session.get("started_at") and session.get("saved_at")
-    )
-    print(f"Total sessions: {len(sessions):,}")
-    print(f"Total sessions with IP: {sessions_with_ip:,}")
-    print(f"Total sessions with country: {sessions_with_country:,}")
-    print(f"Total sessions with time: {sessions_with_time:,}")
+    for i, report in enumerate(REPORTS.values()):
+        if i != 0:
+            print()
+            print()
 
-    session_times = get_session_times(sessions)
-    print(f"Median time: {numpy.percentile(session_times, 50)}")
-    print(f"Maximum time: {session_times[-1]}")
+        report(results, data)
+
+    write_results(results)
 
-    percentiles = compute(results, cities, sessions, "percentiles", get_percentiles)
 
-    print()
-    print()
-    print(f"Median: {int(round(percentiles['50']))}")
-    print(f"25th percentile: {int(round(percentiles['25']))}")
-    print(f"75th percentile: {int(round(percentiles['75']))}")
+def report_sessions(results, data, *, file=None):
+    session_stats = compute_session_stats(results, data)
+    distinct_players = {
+        country: HyperLogLog.from_json(sketch)
+        for country, sketch in session_stats["distinct_players"].items()
+    }
+
+    print(f"Total sessions: {session_stats['total']:,}", file=file)
+    print(f"Total sessions with IP: {session_stats['with_ip']:,}", file=file)
+    print(f"Total sessions with country: {session_stats['with_country']:,}", file=file)
+    print(f"Total sessions with time: {session_stats['with_time']:,}", file=file)
+    print(
+        f"Distinct players (approx.): {distinct_players[ALL_COUNTRIES].count():,}",
+        file=file,
+    )
+    # The median can't be recovered from merged shards, so it may be missing.
+    if session_stats["median_time"] is not None:
+        median_time = timedelta(seconds=session_stats["median_time"])
+        print(f"Median time: {median_time}", file=file)
+    if session_stats["max_time"] is not None:
+        max_time = timedelta(seconds=session_stats["max_time"])
+        print(f"Maximum time: {max_time}", file=file)
+
+    rows = [["rank", "country", "distinct players (approx.)"]]
+    players_by_country = sorted(
+        (
+            (country, sketch.count())
+            for country, sketch in distinct_players.items()
+            if country != ALL_COUNTRIES
+        ),
+        key=lambda kv: kv[1],
+        reverse=True,
+    )
+    for i, (country, count) in enumerate(players_by_country[:20], start=1):
+        rows.append([str(i), country, f"{count:,}"])
+    print(file=file)
+    print(file=file)
+    print("Countries by distinct players", file=file)
+    print_table(rows, file=file)
+
+    return {
+        "total": session_stats["total"],
+        "with_ip": session_stats["with_ip"],
+        "with_country": session_stats["with_country"],
+        "with_time": session_stats["with_time"],
+        "distinct_players": distinct_players[ALL_COUNTRIES].count(),
+        "median_time": session_stats["median_time"],
+        "max_time": session_stats["max_time"],
+        "distinct_players_by_country": dict(players_by_country),
+    }
+
+
+def report_percentiles(results, data, *, file=None):
+    percentiles = compute(results, data, "percentiles", get_percentiles)
+
+    print(f"Median: {int(round(percentiles['50']))}", file=file)
+    print(f"25th percentile: {int(round(percentiles['25']))}", file=file)
+    print(f"75th percentile: {int(round(percentiles['75']))}", file=file)
 
     # 10th through 90th percentiles
     rows = [["percentile", "score"]]
@@ -70,21 +118,23 @@ def main():
             rows.append([f"{i} (median)", int(round(percentiles[str(i)]))])
         else:
             rows.append([str(i), int(round(percentiles[str(i)]))])
-    print()
-    print()
-    print_table(rows)
+    print(file=file)
+    print(file=file)
+    print_table(rows, file=file)
 
     # 90th through 99th percentile
     rows = [["percentile", "score"]]
     for i in range(99, 89, -1):
         rows.append([str(i), int(round(percentiles[str(i)]))])
-    print()
-    print()
-    print_table(rows)
+    print(file=file)
+    print(file=file)
+    print_table(rows, file=file)
 
-    nationalities = compute(
-        results, cities, sessions, "nationalities", get_nationalities,
-    )
+    return percentiles
+
+
+def report_nationalities(results, data, *, file=None):
+    nationalities = compute(results, data, "nationalities", get_nationalities)
     sorted_nationalities = list(sorted(nationalities.items(), key=lambda kv: kv[1]))
     filtered_nationalities = list(
         filter(lambda x: x[1][1] >= 100, sorted_nationalities)
@@ -100,11 +150,9 @@ def main():
         rows.append(
             [str(i), country, str(int(round(median_score))), f"{total_plays:,}"]
         )
-    print()
-    print()
-    print("Best countries by median score (100+ scores)")
-    print_table(rows)
-    print("NOTE: Fix ranks for equal nations when pasting into post.")
+    print("Best countries by median score (100+ scores)", file=file)
+    print_table(rows, file=file)
+    print("NOTE: Fix ranks for equal nations when pasting into post.", file=file)
 
     rows = [["rank", "country", "median score", "total plays"]]
     for i, (country, (median_score, total_plays)) in enumerate(
@@ -113,11 +161,11 @@ def main():
         rows.append(
             [str(i), country, str(int(round(median_score))), f"{total_plays:,}"]
         )
-    print()
-    print()
-    print("Worst countries by median score (100+ scores)")
-    print_table(rows)
-    print("NOTE: Fix ranks for equal nations when pasting into post.")
+    print(file=file)
+    print(file=file)
+    print("Worst countries by median score (100+ scores)", file=file)
+    print_table(rows, file=file)
+    print("NOTE: Fix ranks for equal nations when pasting into post.", file=file)
 
     rows = [["rank", "country", "median score", "total plays"]]
     for i, (country, (median_score, total_plays)) in enumerate(
@@ -126,23 +174,34 @@ def main():
         rows.append(
             [str(i), country, str(int(round(median_score))), f"{total_plays:,}"]
         )
-    print()
-    print()
-    print("All countries by median score (1000+ scores)")
-    print_table(rows)
-    print("NOTE: Fix ranks for equal nations when pasting into post.")
-
+    print(file=file)
+    print(file=file)
+    print("All countries by median score (1000+ scores)", file=file)
+    print_table(rows, file=file)
+    print("NOTE: Fix ranks for equal nations when pasting into post.", file=file)
+
+    def to_json(nationalities):
+        return [
+            {"country": country, "median_score": median_score, "total_plays": plays}
+            for country, (median_score, plays) in nationalities
+        ]
+
+    return {
+        "best": to_json(list(reversed(filtered_nationalities))[:10]),
+        "worst": to_json(filtered_nationalities[:10]),
+        "all": to_json(filtered_nationalities_1000),
+    }
+
+
+def report_best_countries_by_nationality(results, data, *, file=None):
     best_countries_by_nationality = compute(
         results,
-        cities,
-        sessions,
+        data,
         "best_countries_by_nationality",
         get_best_countries_by_nationality,
     )
 
-    print()
-    print()
-    print("Best countries by nationality")
+    print("Best countries by nationality", file=file)
     for country, (best, second_best) in sorted(
         best_countries_by_nationality.items(), key=lambda kv: kv[0]
     ):
@@ -150,150 +209,388 @@ def main():
         second_best_name, second_best_score = second_best
         print(
             f"- {country}: {best_name} ({int(round(best_score)):,}), "
-            + f"{second_best_name} ({int(round(second_best_score)):,})"
+            + f"{second_best_name} ({int(round(second_best_score)):,})",
+            file=file,
         )
 
+    return {
+        country: [{"country": name, "score": score} for name, score in best]
+        for country, best in best_countries_by_nationality.items()
+    }
+
+
+def report_best_known_cities(results, data, *, file=None):
+    total_sessions = compute_session_stats(results, data)["total"]
     best_known_cities = compute(
-        results, cities, sessions, "best_known_cities", get_best_known_cities,
+        results, data, "best_known_cities", get_best_known_cities,
     )
-    print()
-    print()
-    print("Best known cities")
-    print_city_table(best_known_cities, sessions)
+    print("Best known cities", file=file)
+    return print_city_table(best_known_cities, total_sessions, file=file)
 
+
+def report_best_known_cities_by_letter(results, data, *, file=None):
+    total_sessions = compute_session_stats(results, data)["total"]
     best_known_cities_by_letter = compute(
         results,
-        cities,
-        sessions,
+        data,
         "best_known_long_cities_by_letter",
         get_best_known_cities_by_letter,
     )
 
     rows = [["letter", "city", "percentage"]]
+    r = {}
     for letter, (count, cities_list) in sorted(
         best_known_cities_by_letter.items(), key=lambda kv: kv[0]
     ):
         if len(cities_list) > 1:
             raise Exception(cities_list)
 
-        p = city_percentage(cities_list[0], sessions)
+        p = city_percentage(cities_list[0], total_sessions)
         rows.append([f"**{letter}**", city_name(cities_list[0]), p])
-    print()
-    print()
-    print_table(rows)
+        r[letter] = city_json(cities_list[0], total_sessions)
+    print_table(rows, file=file)
 
+    return r
+
+
+def report_biggest_cities_by_letter(results, data, *, file=None):
+    total_sessions = compute_session_stats(results, data)["total"]
+    best_known_cities_by_letter = compute(
+        results,
+        data,
+        "best_known_long_cities_by_letter",
+        get_best_known_cities_by_letter,
+    )
     biggest_cities_by_letter = compute(
         results,
-        cities,
-        sessions,
+        data,
         "biggest_cities_by_letter",
         get_biggest_cities_by_letter,
     )
 
-    print()
-    print()
-    print("Biggest cities that are not the best known for their letter:")
+    print("Biggest cities that are not the best known for their letter:", file=file)
+    r = {}
     for letter in sorted(best_known_cities_by_letter):
         best_known = best_known_cities_by_letter[letter][1][0]
         biggest = biggest_cities_by_letter[letter]
         if best_known["code"] != biggest["code"]:
-            p = city_percentage(biggest, sessions)
-            p2 = city_percentage(best_known, sessions)
+            r[letter] = {
+                "best_known": city_json(best_known, total_sessions),
+                "biggest": city_json(biggest, total_sessions),
+            }
+            p = city_percentage(biggest, total_sessions)
+            p2 = city_percentage(best_known, total_sessions)
             print(
                 f"- {city_name(best_known)} ({p2}, {best_known['population']:,})",
                 end=" ",
+                file=file,
+            )
+            print("beats ", end="", file=file)
+            print(
+                f"**{city_name(biggest)}** ({p}, {biggest['population']:,})",
+                file=file,
             )
-            print("beats ", end="")
-            print(f"**{city_name(biggest)}** ({p}, {biggest['population']:,})")
 
+    return r
+
+
+def report_cities_by_popularity(results, data, *, file=None):
+    total_sessions = compute_session_stats(results, data)["total"]
     cities_by_popularity = compute(
-        results, cities, sessions, "cities_by_popularity", get_cities_by_popularity,
+        results, data, "cities_by_popularity", get_cities_by_popularity,
     )
 
-    print()
-    print()
-    print("Surprisingly popular cities")
-    print_popularity_table(reversed(cities_by_popularity[-10:]), sessions)
+    r = {}
+    print("Surprisingly popular cities", file=file)
+    r["popular"] = print_popularity_table(
+        reversed(cities_by_popularity[-10:]), total_sessions, file=file
+    )
 
-    print()
-    print()
-    print("Surprisingly popular cities (at least 10%)")
+    print(file=file)
+    print(file=file)
+    print("Surprisingly popular cities (at least 10%)", file=file)
     popular_cities = list(
-        filter(lambda city: city["count"] / len(sessions) >= 0.1, cities_by_popularity)
+        filter(
+            lambda city: city["count"] / total_sessions >= 0.1, cities_by_popularity
+        )
+    )
+    r["popular_at_least_10_percent"] = print_popularity_table(
+        reversed(popular_cities[-10:]), total_sessions, file=file
     )
-    print_popularity_table(reversed(popular_cities[-10:]), sessions)
 
-    print()
-    print()
-    print("Surprisingly popular cities over 100,000")
+    print(file=file)
+    print(file=file)
+    print("Surprisingly popular cities over 100,000", file=file)
     cities_by_popularity_over_50k = list(
         filter(lambda city: city["population"] >= 100000, cities_by_popularity)
     )
-    print_popularity_table(reversed(cities_by_popularity_over_50k[-10:]), sessions)
+    r["popular_over_100000"] = print_popularity_table(
+        reversed(cities_by_popularity_over_50k[-10:]), total_sessions, file=file
+    )
 
-    print()
-    print()
-    print("Surprisingly unpopular cities")
-    print_popularity_table(cities_by_popularity[:10], sessions)
+    print(file=file)
+    print(file=file)
+    print("Surprisingly unpopular cities", file=file)
+    r["unpopular"] = print_popularity_table(
+        cities_by_popularity[:10], total_sessions, file=file
+    )
 
-    print()
-    print()
-    print("Surprisingly unpopular cities (at least 10% expected)")
+    print(file=file)
+    print(file=file)
+    print("Surprisingly unpopular cities (at least 10% expected)", file=file)
     unpopular_cities = list(
         filter(
-            lambda city: city["expectedCount"] / len(sessions) >= 0.1,
+            lambda city: city["expectedCount"] / total_sessions >= 0.1,
             cities_by_popularity,
         )
     )
-    print_popularity_table(unpopular_cities[:10], sessions)
+    r["unpopular_at_least_10_percent_expected"] = print_popularity_table(
+        unpopular_cities[:10], total_sessions, file=file
+    )
+
+    return r
 
+
+def report_forgotten_capitals(results, data, *, file=None):
+    total_sessions = compute_session_stats(results, data)["total"]
     forgotten_capitals = compute(
-        results, cities, sessions, "forgotten_capitals", get_forgotten_capitals,
+        results, data, "forgotten_capitals", get_forgotten_capitals,
     )
-    print()
-    print()
-    print("Forgotten capitals")
-    print_city_table(forgotten_capitals, sessions)
+    print("Forgotten capitals", file=file)
+    return print_city_table(forgotten_capitals, total_sessions, file=file)
+
 
+def report_forgotten_countries(results, data, *, file=None):
+    total_sessions = compute_session_stats(results, data)["total"]
     forgotten_countries = compute(
-        results, cities, sessions, "forgotten_countries", get_forgotten_countries,
+        results, data, "forgotten_countries", get_forgotten_countries,
     )
-    print()
-    print()
     rows = [["rank", "country", "percentage"]]
     for i, (country, count) in enumerate(forgotten_countries, start=1):
-        p = count / len(sessions)
+        p = count / total_sessions
         rows.append([str(i), country, f"{p:.1%}"])
-    print("Forgotten countries")
-    print_table(rows)
+    print("Forgotten countries", file=file)
+    print_table(rows, file=file)
 
-    write_results(results)
+    return [
+        {"country": country, "percentage": count / total_sessions}
+        for country, count in forgotten_countries
+    ]
 
 
-def compute(results, cities, sessions, key, f, *, force=False):
+# The sections of the report, in the order that `main` prints them. Each function
+# prints its section as Markdown and returns the same statistics as a JSON-
+# serializable value.
+REPORTS = {
+    "sessions": report_sessions,
+    "percentiles": report_percentiles,
+    "nationalities": report_nationalities,
+    "best_countries_by_nationality": report_best_countries_by_nationality,
+    "best_known_cities": report_best_known_cities,
+    "best_known_cities_by_letter": report_best_known_cities_by_letter,
+    "biggest_cities_by_letter": report_biggest_cities_by_letter,
+    "cities_by_popularity": report_cities_by_popularity,
+    "forgotten_capitals": report_forgotten_capitals,
+    "forgotten_countries": report_forgotten_countries,
+}
+
+
+def compute(results, data, key, f, *, force=False):
     if force or not results.get(key):
-        results[key] = f(cities, sessions)
+        results[key] = f(data.cities, data.sessions)
 
     return results[key]
 
 
-def get_session_times(sessions):
+def compute_session_stats(results, data, *, force=False):
+    # Cached like the other statistics, but without going through `compute`, so that
+    # the cities don't have to be read. The counts and the distinct-player sketches
+    # are computed from the same data and always replaced together, so that they
+    # agree with each other. Results from different shards are combined explicitly
+    # with `merge_results`.
+    if force or not results.get("session_stats"):
+        results["session_stats"] = get_session_stats(data.sessions)
+
+    return results["session_stats"]
+
+
+class Dataset:
+    """
+    Reads the cities and sessions from disk the first time they are accessed.
+    """
+
+    def __init__(self):
+        self._cities = None
+        self._sessions = None
+
+    @property
+    def cities(self):
+        if self._cities is None:
+            self._cities = read_cities()
+
+        return self._cities
+
+    @property
+    def sessions(self):
+        if self._sessions is None:
+            self._sessions = read_sessions()
+
+        return self._sessions
+
+
+def get_session_stats(sessions):
+    """
+    Computes the session counts, session times and per-country distinct-player
+    sketches in a single pass over the sessions.
+
+    Times are in seconds, so that they can be stored in `results.json`.
+
+    Players are identified by IP address. Sessions with an IP but no country are
+    only counted towards the `ALL_COUNTRIES` sketch.
+    """
+    import numpy
+
+    with_ip = 0
+    with_country = 0
+    with_time = 0
     times = []
+    distinct_players = defaultdict(HyperLogLog)
+    # Always present, so that the report works even if no session has an IP.
+    distinct_players[ALL_COUNTRIES] = HyperLogLog()
     for session in sessions.values():
-        started_at = session.get("started_at")
-        saved_at = session.get("saved_at")
-        if not started_at or not saved_at:
-            continue
+        ip = session.get("ip")
+        country = session.get("country")
+        if ip:
+            with_ip += 1
+            distinct_players[ALL_COUNTRIES].add(ip)
+            if country:
+                distinct_players[country].add(ip)
+
+        if country:
+            with_country += 1
 
-        started_at = dateutil.parser.isoparse(started_at)
-        saved_at = dateutil.parser.isoparse(saved_at)
-        times.append(saved_at - started_at)
+        time = get_session_time(session)
+        if time is not None:
+            with_time += 1
+            times.append(time.total_seconds())
 
     times.sort()
-    return times
+    return {
+        "total": len(sessions),
+        "with_ip": with_ip,
+        "with_country": with_country,
+        "with_time": with_time,
+        "median_time": float(numpy.percentile(times, 50)) if times else None,
+        "max_time": times[-1] if times else None,
+        "distinct_players": {
+            country: sketch.to_json() for country, sketch in distinct_players.items()
+        },
+    }
+
+
+def merge_results(paths):
+    """
+    Merges the session statistics of several `results.json` files, e.g. computed on
+    different shards of the sessions, and returns a results dictionary with only the
+    merged `session_stats`.
+
+    The session counts are summed, so the shards must not share any sessions. The
+    distinct-player sketches are merged, so players may appear in several shards
+    without being double-counted. The median session time can't be merged and is
+    left out.
+
+    Raises `ValueError` if there are no paths, or if one of the files has no
+    session statistics.
+    """
+    if not paths:
+        raise ValueError("no results files to merge")
+
+    merged = None
+    for path in paths:
+        with open(path, "r", encoding="utf8") as f:
+            session_stats = json.load(f).get("session_stats")
+
+        if not session_stats:
+            raise ValueError(f"{path} has no session_stats")
+
+        if merged is None:
+            merged = copy.deepcopy(session_stats)
+            merged["median_time"] = None
+            continue
+
+        for key in ["total", "with_ip", "with_country", "with_time"]:
+            merged[key] += session_stats[key]
+
+        if session_stats["max_time"] is not None:
+            merged["max_time"] = max(
+                merged["max_time"] or 0, session_stats["max_time"]
+            )
+
+        merged["distinct_players"] = merge_distinct_players(
+            merged["distinct_players"], session_stats["distinct_players"]
+        )
+
+    return {"session_stats": merged}
+
+
+def merge_main(args):
+    """
+    Prints the session statistics for several shards of the data combined, and
+    optionally saves them as a results file that `main` and `server.py` can read.
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="analysis.py merge")
+    parser.add_argument("paths", nargs="+", help="results.json files to merge")
+    parser.add_argument(
+        "--output", help="write the merged session statistics to this results file"
+    )
+    args = parser.parse_args(args)
+
+    try:
+        results = merge_results(args.paths)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+
+    report_sessions(results, None)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+def merge_distinct_players(*sketches_by_country):
+    """
+    Merges any number of serialized `{country: sketch}` dictionaries.
+    """
+    merged = {}
+    for sketches in sketches_by_country:
+        for country, sketch in sketches.items():
+            sketch = HyperLogLog.from_json(sketch)
+            if country in merged:
+                merged[country].merge(sketch)
+            else:
+                merged[country] = sketch
+
+    return {country: sketch.to_json() for country, sketch in merged.items()}
+
+
+def get_session_time(session):
+    import dateutil.parser
+
+    started_at = session.get("started_at")
+    saved_at = session.get("saved_at")
+    if not started_at or not saved_at:
+        return None
+
+    started_at = dateutil.parser.isoparse(started_at)
+    saved_at = dateutil.parser.isoparse(saved_at)
+    return saved_at - started_at
 
 
 def get_percentiles(cities, sessions):
+    import numpy
+
     scores = list(sorted(len(session["cities"]) for session in sessions.values()))
     percentiles = [
         10,
@@ -321,6 +618,8 @@ def get_percentiles(cities, sessions):
 
 
 def get_nationalities(cities, sessions):
+    import numpy
+
     scores_by_country = defaultdict(list)
     for session in sessions.values():
         country = session.get("country")
@@ -459,16 +758,26 @@ def city_name(city):
     return f"{city['name']}, {city['country']}"
 
 
-def city_percentage(city, sessions):
-    p = city["count"] / len(sessions)
+def city_json(city, total_sessions):
+    return {
+        "name": city["name"],
+        "country": city["country"],
+        "population": city["population"],
+        "percentage": city["count"] / total_sessions,
+    }
+
+
+def city_percentage(city, total_sessions):
+    p = city["count"] / total_sessions
     return f"{p:.1%}"
 
 
-def print_popularity_table(cities, sessions):
+def print_popularity_table(cities, total_sessions, *, file=None):
     rows = [["rank", "city", "population", "popularity", "expected popularity"]]
+    r = []
     for i, city in enumerate(cities, start=1):
-        p = city["count"] / len(sessions)
-        ex_p = city["expectedCount"] / len(sessions)
+        p = city["count"] / total_sessions
+        ex_p = city["expectedCount"] / total_sessions
         rows.append(
             [
                 str(i),
@@ -478,37 +787,44 @@ def print_popularity_table(cities, sessions):
                 f"{ex_p:.1%}",
             ]
         )
-    print_table(rows)
+        r.append(
+            dict(city_json(city, total_sessions), expected_percentage=ex_p)
+        )
+    print_table(rows, file=file)
+    return r
 
 
-def print_city_table(cities, sessions):
+def print_city_table(cities, total_sessions, *, file=None):
     rows = [["rank", "city", "percentage"]]
     for i, city in enumerate(cities, start=1):
-        rows.append([str(i), city_name(city), city_percentage(city, sessions)])
-    print_table(rows)
+        rows.append([str(i), city_name(city), city_percentage(city, total_sessions)])
+    print_table(rows, file=file)
+    return [city_json(city, total_sessions) for city in cities]
 
 
-def print_table(rows):
+def print_table(rows, *, file=None):
     widths = [max(len(str(row[i])) for row in rows) for i in range(len(rows[0]))]
 
     for i, row in enumerate(rows):
         for j, (cell, width) in enumerate(zip(row, widths)):
-            print(str(cell).ljust(width), end="")
+            print(str(cell).ljust(width), end="", file=file)
             if j != len(row) - 1:
-                print(" | ", end="")
+                print(" | ", end="", file=file)
 
-        print()
+        print(file=file)
 
         if i == 0:
             for j, width in enumerate(widths):
-                print("-" * width, end="")
+                print("-" * width, end="", file=file)
                 if j != len(row) - 1:
-                    print(" | ", end="")
+                    print(" | ", end="", file=file)
 
-            print()
+            print(file=file)
 
 
 def expected_guesses(population):
+    import numpy
+
     best_fit_slopes = [
         1.3418776482343513,
         1.429839330734348,
@@ -534,6 +850,8 @@ def expected_guesses(population):
 
 
 def expected_guesses_usa(population):
+    import numpy
+
     # Expected guesses for the U.S. quiz, for posterity.
     params = [
         2.04126476,
@@ -557,6 +875,79 @@ def expected_guesses_usa(population):
             return numpy.exp(slope * numpy.log10(population) + intercept)
 
 
+# Key for the sketch of distinct players across all countries in the
+# `distinct_players` results.
+ALL_COUNTRIES = "__all"
+
+
+class HyperLogLog:
+    """
+    A HyperLogLog sketch for approximately counting distinct strings in constant
+    memory.
+
+    With the default precision of 10 bits, the sketch has 1,024 registers and a
+    standard error of about 3%. Two sketches with the same precision can be merged,
+    and the result is the same as if every item had been added to a single sketch.
+
+    See Flajolet et al., "HyperLogLog: the analysis of a near-optimal cardinality
+    estimation algorithm" (2007).
+    """
+
+    def __init__(self, precision=10, registers=None):
+        if not 4 <= precision <= 16:
+            raise ValueError(f"precision must be between 4 and 16: {precision}")
+
+        self.precision = precision
+        m = 1 << precision
+        if registers is None:
+            registers = bytearray(m)
+        elif len(registers) != m:
+            raise ValueError(f"expected {m} registers, got {len(registers)}")
+
+        self.registers = bytearray(registers)
+
+    def add(self, item):
+        # Python's built-in `hash` is randomized per process, so a stable hash is
+        # needed for sketches to be mergeable across runs.
+        digest = hashlib.blake2b(item.encode("utf8"), digest_size=8).digest()
+        x = int.from_bytes(digest, "big")
+        index = x >> (64 - self.precision)
+        rest = x & ((1 << (64 - self.precision)) - 1)
+        # Position of the leftmost 1-bit in the remaining bits, starting from 1.
+        rank = (64 - self.precision) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other):
+        if other.precision != self.precision:
+            raise ValueError(
+                f"cannot merge sketches with precision {self.precision} "
+                + f"and {other.precision}"
+            )
+
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def count(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+
+        # Small-range correction: fall back to linear counting while there are
+        # still empty registers.
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)
+
+        return int(round(estimate))
+
+    def to_json(self):
+        return {"precision": self.precision, "registers": self.registers.hex()}
+
+    @classmethod
+    def from_json(cls, data):
+        return cls(data["precision"], bytes.fromhex(data["registers"]))
+
+
 def read_sessions(*, exclude_small=True):
     with open("data/sessions.json", "r", encoding="utf8") as f:
         sessions = json.load(f)
@@ -614,4 +1005,9 @@ def geolocate():
 
 
 if __name__ == "__main__":
-    main()
+    # `python3 analysis.py merge [--output PATH] a/results.json b/results.json`
+    # combines the session statistics of several shards of the data.
+    if sys.argv[1:2] == ["merge"]:
+        merge_main(sys.argv[2:])
+    else:
+        main()
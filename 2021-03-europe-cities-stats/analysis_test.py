@@ -0,0 +1,106 @@
+import json
+import os
+import tempfile
+import unittest
+
+from analysis import (
+    ALL_COUNTRIES,
+    HyperLogLog,
+    get_session_stats,
+    merge_results,
+)
+
+
+def sketch_of(items, precision=10):
+    sketch = HyperLogLog(precision)
+    for item in items:
+        sketch.add(item)
+    return sketch
+
+
+class HyperLogLogTests(unittest.TestCase):
+    def test_count(self):
+        for n in [0, 10, 1000, 50000]:
+            with self.subTest(n=n):
+                sketch = sketch_of(f"10.0.{i}" for i in range(n))
+                # The standard error is about 3% at the default precision.
+                self.assertAlmostEqual(sketch.count(), n, delta=max(1, n * 0.05))
+
+    def test_count_duplicates(self):
+        sketch = sketch_of(f"10.0.{i % 100}" for i in range(10000))
+
+        self.assertAlmostEqual(sketch.count(), 100, delta=5)
+
+    def test_merge(self):
+        a = sketch_of(f"10.0.{i}" for i in range(0, 3000))
+        b = sketch_of(f"10.0.{i}" for i in range(2000, 5000))
+        union = sketch_of(f"10.0.{i}" for i in range(0, 5000))
+
+        a.merge(b)
+
+        self.assertEqual(a.registers, union.registers)
+
+    def test_merge_different_precisions(self):
+        with self.assertRaises(ValueError):
+            HyperLogLog(10).merge(HyperLogLog(12))
+
+    def test_json(self):
+        sketch = sketch_of(f"10.0.{i}" for i in range(1000))
+
+        copy = HyperLogLog.from_json(json.loads(json.dumps(sketch.to_json())))
+
+        self.assertEqual(copy.precision, sketch.precision)
+        self.assertEqual(copy.registers, sketch.registers)
+
+
+class SessionStatsTests(unittest.TestCase):
+    def test_no_ips(self):
+        sessions = {"1": {"cities": []}, "2": {"cities": [], "country": "France"}}
+
+        session_stats = get_session_stats(sessions)
+
+        self.assertEqual(session_stats["total"], 2)
+        self.assertEqual(session_stats["with_ip"], 0)
+        sketch = HyperLogLog.from_json(session_stats["distinct_players"][ALL_COUNTRIES])
+        self.assertEqual(sketch.count(), 0)
+
+    def test_merge_results(self):
+        shard1 = {str(i): {"ip": f"10.0.{i}", "country": "France"} for i in range(50)}
+        shard2 = {
+            str(i): {"ip": f"10.0.{i}", "country": "Spain"} for i in range(25, 75)
+        }
+
+        with tempfile.TemporaryDirectory() as d:
+            paths = []
+            for i, sessions in enumerate([shard1, shard2]):
+                path = os.path.join(d, f"results{i}.json")
+                with open(path, "w", encoding="utf8") as f:
+                    json.dump({"session_stats": get_session_stats(sessions)}, f)
+                paths.append(path)
+
+            merged = merge_results(paths)["session_stats"]
+
+        self.assertEqual(merged["total"], 100)
+        self.assertEqual(merged["with_ip"], 100)
+        self.assertEqual(
+            HyperLogLog.from_json(merged["distinct_players"][ALL_COUNTRIES]).count(), 75
+        )
+        self.assertEqual(
+            set(merged["distinct_players"]), {ALL_COUNTRIES, "France", "Spain"}
+        )
+
+    def test_merge_results_errors(self):
+        with self.assertRaises(ValueError):
+            merge_results([])
+
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "results.json")
+            with open(path, "w", encoding="utf8") as f:
+                json.dump({}, f)
+
+            with self.assertRaisesRegex(ValueError, "has no session_stats"):
+                merge_results([path])
+
+
+if __name__ == "__main__":
+    unittest.main()
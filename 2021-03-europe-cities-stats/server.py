@@ -0,0 +1,116 @@
+"""
+A local HTTP server for the statistics printed by `analysis.py`, so that they can be
+looked up without rerunning the analysis.
+
+Usage:
+
+    python3 server.py [--host HOST] [--port PORT]
+
+Endpoints:
+
+    GET /                  the names of the statistics, as JSON
+    GET /<name>.json       the statistic as JSON
+    GET /<name>.md         the statistic as formatted Markdown, as printed by `main`
+
+The cached results and the raw data are loaded once and kept in memory. Statistics
+that aren't cached yet are computed in a background thread and written back to
+`data/results.json`.
+"""
+import argparse
+import asyncio
+import io
+from concurrent.futures import ThreadPoolExecutor
+
+from aiohttp import web
+
+from analysis import REPORTS, Dataset, read_results, write_results
+
+
+class ReportServer:
+    def __init__(self):
+        self.results = read_results()
+        self.data = Dataset()
+        # A single worker, because the computations share `self.results` and the
+        # lazily loaded `self.data`.
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        # Rendered statistics, by name.
+        self.cache = {}
+        # Statistics that are currently being rendered, by name, so that concurrent
+        # requests for the same statistic wait on a single computation.
+        self.pending = {}
+
+    def make_app(self):
+        app = web.Application()
+        app.add_routes(
+            [
+                web.get("/", self.handle_index),
+                web.get("/{name:[a-z_]+}.{format:json|md}", self.handle_report),
+            ]
+        )
+        app.on_cleanup.append(self.on_cleanup)
+        return app
+
+    async def handle_index(self, request):
+        return web.json_response({"statistics": list(REPORTS)})
+
+    async def handle_report(self, request):
+        name = request.match_info["name"]
+        if name not in REPORTS:
+            raise web.HTTPNotFound(text=f"unknown statistic: {name}\n")
+
+        rendered = await self.get_report(name)
+        if request.match_info["format"] == "json":
+            return web.json_response(rendered["json"])
+        else:
+            return web.Response(
+                text=rendered["markdown"], content_type="text/markdown"
+            )
+
+    async def get_report(self, name):
+        rendered = self.cache.get(name)
+        if rendered is not None:
+            return rendered
+
+        task = self.pending.get(name)
+        if task is None:
+            task = asyncio.ensure_future(self.render_in_executor(name))
+            self.pending[name] = task
+            task.add_done_callback(lambda _: self.pending.pop(name, None))
+
+        # Shield the task so that one client disconnecting doesn't cancel the
+        # computation for everyone else waiting on it.
+        return await asyncio.shield(task)
+
+    async def render_in_executor(self, name):
+        loop = asyncio.get_running_loop()
+        rendered = await loop.run_in_executor(self.executor, self.render, name)
+        self.cache[name] = rendered
+        return rendered
+
+    def render(self, name):
+        report = REPORTS[name]
+        cached_keys = set(key for key in self.results if self.results[key])
+
+        out = io.StringIO()
+        value = report(self.results, self.data, file=out)
+
+        if any(key not in cached_keys for key in self.results):
+            write_results(self.results)
+
+        return {
+            "markdown": out.getvalue(),
+            "json": value,
+        }
+
+    async def on_cleanup(self, app):
+        self.executor.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+
+    server = ReportServer()
+    web.run_app(server.make_app(), host=args.host, port=args.port)
@@ -0,0 +1,84 @@
+import asyncio
+import json
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from aiohttp.test_utils import TestClient, TestServer
+
+import server
+from server import ReportServer
+
+
+def report_stub(results, data, *, file=None):
+    # Slow enough that concurrent requests overlap while it runs.
+    time.sleep(0.2)
+    results["stub"] = [1, 2, 3]
+    print("stub", file=file)
+    return {"values": results["stub"]}
+
+
+class ReportServerTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        cwd = os.getcwd()
+        os.chdir(self.tmp.name)
+        self.addCleanup(os.chdir, cwd)
+        os.mkdir("data")
+
+        patcher = mock.patch.dict(server.REPORTS, {"stub": report_stub}, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.server = ReportServer()
+        self.render = mock.Mock(wraps=self.server.render)
+        self.server.render = self.render
+        self.client = TestClient(TestServer(self.server.make_app()))
+        await self.client.start_server()
+
+    async def asyncTearDown(self):
+        await self.client.close()
+
+    async def get(self, path):
+        response = await self.client.get(path)
+        return response.status, await response.text()
+
+    async def test_concurrent_requests(self):
+        responses = await asyncio.gather(
+            *[self.get("/stub.json") for _ in range(5)], self.get("/stub.md")
+        )
+
+        self.assertEqual(self.render.call_count, 1)
+        for status, _ in responses:
+            self.assertEqual(status, 200)
+        for _, text in responses[:5]:
+            self.assertEqual(json.loads(text), {"values": [1, 2, 3]})
+        self.assertEqual(responses[5][1], "stub\n")
+
+    async def test_cache(self):
+        await self.get("/stub.json")
+        self.assertIn("stub", self.server.cache)
+
+        status, text = await self.get("/stub.md")
+
+        self.assertEqual(status, 200)
+        self.assertEqual(text, "stub\n")
+        self.assertEqual(self.render.call_count, 1)
+
+    async def test_write_back(self):
+        await self.get("/stub.json")
+
+        with open("data/results.json", "r", encoding="utf8") as f:
+            self.assertEqual(json.load(f), {"stub": [1, 2, 3]})
+
+    async def test_unknown_statistic(self):
+        status, _ = await self.get("/nope.json")
+
+        self.assertEqual(status, 404)
+
+
+if __name__ == "__main__":
+    unittest.main()
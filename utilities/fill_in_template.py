@@ -1,20 +1,24 @@
 import argparse
+import csv
+import json
+import re
 import sys
 from pathlib import Path
+from urllib.parse import urlparse
 
 
-def main(*, title, url):
-    p = Path(__file__).absolute().parent
+def main(*, title, url, yes=False):
+    txt_template, html_template = load_templates()
+    variables = {"TITLE": title, "URL": url}
 
-    txt_template = (p / "email_template.txt").read_text()
-    txt_email = txt_template.replace("{{URL}}", url).replace("{{TITLE}}", title)
+    txt_email = txt_template.render(variables)
     print()
     print(txt_email)
     print()
-    confirm()
+    if not yes:
+        confirm()
 
-    html_template = (p / "email_template.html").read_text()
-    html_email = html_template.replace("{{URL}}", url).replace("{{TITLE}}", title)
+    html_email = html_template.render(variables)
 
     print()
     print(html_email)
@@ -22,6 +26,139 @@ def main(*, title, url):
     print("Copy-paste the above into Sendy.")
 
 
+def main_batch(*, manifest, output_dir, yes=False):
+    """
+    Renders the emails for every post in the manifest, and writes them to
+    `<output_dir>/<name>.txt` and `<output_dir>/<name>.html`.
+
+    Every post is rendered before anything is written, so a missing variable in any
+    post aborts the whole batch.
+    """
+    txt_template, html_template = load_templates()
+    posts = read_manifest(manifest)
+
+    outputs = {}
+    for i, variables in enumerate(posts, start=1):
+        name = output_name(variables, i)
+        if name in outputs:
+            raise TemplateError(f"post {i}: duplicate output name: {name}")
+
+        try:
+            outputs[name] = (
+                txt_template.render(variables),
+                html_template.render(variables),
+            )
+        except TemplateError as e:
+            raise TemplateError(f"post {i} ({name}): {e}") from None
+
+    print(f"Rendered {len(outputs):,} post(s) into {output_dir}/")
+    if not yes:
+        confirm()
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    for name, (txt_email, html_email) in outputs.items():
+        (output_dir / f"{name}.txt").write_text(txt_email)
+        (output_dir / f"{name}.html").write_text(html_email)
+
+    print(f"Wrote {2 * len(outputs):,} file(s).")
+
+
+class TemplateError(Exception):
+    pass
+
+
+class Template:
+    """
+    A template with `{{VAR}}` placeholders, compiled once so that rendering it is a
+    single pass over the pieces of the template rather than one `str.replace` per
+    variable.
+    """
+
+    PLACEHOLDER = re.compile(r"\{\{([A-Za-z_][A-Za-z0-9_]*)\}\}")
+
+    def __init__(self, text):
+        # `re.split` with a capturing group alternates between literal text (even
+        # indices) and placeholder names (odd indices).
+        self.pieces = self.PLACEHOLDER.split(text)
+        self.variables = set(self.pieces[1::2])
+
+    def render(self, variables):
+        missing = self.variables - variables.keys()
+        if missing:
+            names = ", ".join("{{" + v + "}}" for v in sorted(missing))
+            raise TemplateError(f"missing value for {names}")
+
+        pieces = self.pieces.copy()
+        for i in range(1, len(pieces), 2):
+            pieces[i] = variables[pieces[i]]
+
+        return "".join(pieces)
+
+
+def load_templates():
+    p = Path(__file__).absolute().parent
+    return (
+        Template((p / "email_template.txt").read_text()),
+        Template((p / "email_template.html").read_text()),
+    )
+
+
+def read_manifest(path):
+    """
+    Reads a list of posts from a CSV file with a header row, or a JSON file with a
+    list of objects. Keys are upper-cased to match the template placeholders, so a
+    `title` column fills in `{{TITLE}}`.
+    """
+    path = Path(path)
+    if path.suffix not in (".csv", ".json"):
+        raise TemplateError(f"manifest must be a .csv or .json file: {path}")
+
+    try:
+        # `utf-8-sig` skips the byte-order mark that spreadsheet programs put at the
+        # start of exported CSV files.
+        with open(path, "r", encoding="utf-8-sig", newline="") as f:
+            if path.suffix == ".json":
+                posts = json.load(f)
+            else:
+                posts = list(csv.DictReader(f))
+    except OSError as e:
+        raise TemplateError(f"could not read manifest {path}: {e.strerror}") from None
+
+    if not isinstance(posts, list) or not all(isinstance(p, dict) for p in posts):
+        raise TemplateError(f"manifest must be a list of posts: {path}")
+
+    r = []
+    for i, post in enumerate(posts, start=1):
+        variables = {}
+        for k, v in post.items():
+            # `csv.DictReader` uses a key of `None` for the extra fields of a row that
+            # is too long, and a value of `None` for the missing fields of a row that
+            # is too short.
+            if k is None:
+                raise TemplateError(f"post {i}: too many fields")
+            if v is None:
+                raise TemplateError(f"post {i}: missing value for {k}")
+
+            variables[k.strip().upper()] = str(v)
+        r.append(variables)
+
+    return r
+
+
+def output_name(variables, i):
+    """
+    Returns the base name of the output files for a post: its `NAME` if it has one,
+    otherwise the last component of its URL.
+    """
+    name = variables.get("NAME")
+    if not name and variables.get("URL"):
+        name = urlparse(variables["URL"]).path.rstrip("/").rsplit("/", 1)[-1]
+
+    name = re.sub(r"[^A-Za-z0-9_.-]+", "-", name or "").strip("-.")
+    return name or f"post-{i}"
+
+
 def confirm():
     while True:
         r = input("Continue? ").strip().lower()
@@ -34,8 +171,30 @@ def confirm():
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
-    parser.add_argument("--url", required=True)
-    parser.add_argument("--title", required=True)
+    parser.add_argument("--url")
+    parser.add_argument("--title")
+    parser.add_argument(
+        "--manifest", help="CSV or JSON file of posts to render in one batch"
+    )
+    parser.add_argument(
+        "--output-dir", default="emails", help="where to write the batch output"
+    )
+    parser.add_argument(
+        "--yes", "-y", action="store_true", help="don't ask for confirmation"
+    )
     args = parser.parse_args()
 
-    main(title=args.title, url=args.url)
+    if args.manifest:
+        if args.url or args.title:
+            parser.error("--url and --title cannot be used with --manifest")
+    elif not args.url or not args.title:
+        parser.error("--url and --title are required without --manifest")
+
+    try:
+        if args.manifest:
+            main_batch(manifest=args.manifest, output_dir=args.output_dir, yes=args.yes)
+        else:
+            main(title=args.title, url=args.url, yes=args.yes)
+    except TemplateError as e:
+        print(f"error: {e}", file=sys.stderr)
+        sys.exit(1)
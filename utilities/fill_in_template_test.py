@@ -0,0 +1,149 @@
+import io
+import json
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from pathlib import Path
+
+from fill_in_template import (
+    Template,
+    TemplateError,
+    main_batch,
+    output_name,
+    read_manifest,
+)
+
+
+class TemplateTests(unittest.TestCase):
+    def test_render(self):
+        template = Template('"{{TITLE}}" at {{URL}} ({{TITLE}})')
+
+        self.assertEqual(
+            template.render({"TITLE": "Hello", "URL": "https://example.com"}),
+            '"Hello" at https://example.com (Hello)',
+        )
+
+    def test_render_missing_variable(self):
+        template = Template("{{TITLE}} at {{URL}}")
+
+        with self.assertRaisesRegex(TemplateError, r"missing value for \{\{URL\}\}"):
+            template.render({"TITLE": "Hello"})
+
+
+class ReadManifestTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def write(self, name, text):
+        path = Path(self.tmp.name) / name
+        path.write_text(text, encoding="utf8")
+        return path
+
+    def test_csv(self):
+        path = self.write("posts.csv", 'title,url\n"Hello, world",https://a.com\n')
+
+        self.assertEqual(
+            read_manifest(path), [{"TITLE": "Hello, world", "URL": "https://a.com"}]
+        )
+
+    def test_csv_with_byte_order_mark(self):
+        path = self.write("posts.csv", "\ufefftitle, url\nHello,https://a.com\n")
+
+        self.assertEqual(
+            read_manifest(path), [{"TITLE": "Hello", "URL": "https://a.com"}]
+        )
+
+    def test_missing_file(self):
+        path = Path(self.tmp.name) / "missing.csv"
+
+        with self.assertRaisesRegex(TemplateError, "could not read manifest .*missing"):
+            read_manifest(path)
+
+    def test_csv_too_few_fields(self):
+        path = self.write("posts.csv", "title,url\nHello,https://a.com\nOnly\n")
+
+        with self.assertRaisesRegex(TemplateError, "post 2: missing value for url"):
+            read_manifest(path)
+
+    def test_csv_too_many_fields(self):
+        path = self.write("posts.csv", "title,url\nHello,https://a.com,extra\n")
+
+        with self.assertRaisesRegex(TemplateError, "post 1: too many fields"):
+            read_manifest(path)
+
+    def test_json(self):
+        path = self.write(
+            "posts.json", json.dumps([{"title": "Hello", "url": "https://a.com"}])
+        )
+
+        self.assertEqual(
+            read_manifest(path), [{"TITLE": "Hello", "URL": "https://a.com"}]
+        )
+
+    def test_json_null(self):
+        path = self.write("posts.json", json.dumps([{"title": "Hello", "url": None}]))
+
+        with self.assertRaisesRegex(TemplateError, "post 1: missing value for url"):
+            read_manifest(path)
+
+
+class MainBatchTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.output_dir = Path(self.tmp.name) / "emails"
+
+    def run_batch(self, posts):
+        manifest = Path(self.tmp.name) / "posts.json"
+        manifest.write_text(json.dumps(posts), encoding="utf8")
+        with redirect_stdout(io.StringIO()):
+            main_batch(manifest=manifest, output_dir=self.output_dir, yes=True)
+
+    def test_batch(self):
+        self.run_batch(
+            [
+                {"title": "First", "url": "https://a.com/blog/first/"},
+                {"title": "Second", "url": "https://a.com/blog/second"},
+            ]
+        )
+
+        self.assertEqual(
+            sorted(p.name for p in self.output_dir.iterdir()),
+            ["first.html", "first.txt", "second.html", "second.txt"],
+        )
+        self.assertIn('"Second"', (self.output_dir / "second.txt").read_text())
+
+    def test_batch_writes_nothing_on_error(self):
+        with self.assertRaisesRegex(TemplateError, r"post 2 \(second\)"):
+            self.run_batch(
+                [
+                    {"title": "First", "url": "https://a.com/blog/first"},
+                    {"url": "https://a.com/blog/second"},
+                ]
+            )
+
+        self.assertFalse(self.output_dir.exists())
+
+    def test_batch_duplicate_names(self):
+        with self.assertRaisesRegex(TemplateError, "post 2: duplicate output name"):
+            self.run_batch(
+                [
+                    {"title": "First", "url": "https://a.com/blog/post"},
+                    {"title": "Second", "url": "https://b.com/post/"},
+                ]
+            )
+
+        self.assertFalse(self.output_dir.exists())
+
+    def test_output_name(self):
+        self.assertEqual(
+            output_name({"NAME": "my post", "URL": "https://a.com/x"}, 1), "my-post"
+        )
+        self.assertEqual(output_name({"URL": "https://a.com/blog/hello/"}, 1), "hello")
+        self.assertEqual(output_name({"URL": "https://a.com/"}, 3), "post-3")
+        self.assertEqual(output_name({}, 4), "post-4")
+
+
+if __name__ == "__main__":
+    unittest.main()